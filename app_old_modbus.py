@@ -16,7 +16,9 @@ Author: AI Assistant
 Date: 2025-10-23
 """
 
+import gzip
 import socket
+import selectors
 import struct
 import threading
 import time
@@ -25,8 +27,24 @@ import math
 import logging
 import os
 import json
+import numpy as np
+from collections import namedtuple
 from datetime import datetime
-from http.server import HTTPServer, BaseHTTPRequestHandler
+
+try:
+    import orjson  # C-сериализатор: сразу bytes, без промежуточной str
+except ImportError:  # эмулятор должен работать и на чистой stdlib
+    orjson = None
+
+
+def _json_bytes(data):
+    """Сериализовать в JSON-байты (orjson если установлен, иначе stdlib)"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 
 # ============================================================================
@@ -39,13 +57,43 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Скомпилированные форматы Modbus-запроса: Struct кэширует разбор
+# формат-строки один раз, парсинг каждого запроса его не повторяет
+_MBAP = struct.Struct('>HHHBB')   # transaction, protocol, length, unit, function
+_FC03 = struct.Struct('>HH')      # start address, quantity
+_U16 = struct.Struct('>H')
+_HDR3 = struct.Struct('>HHH')     # transaction, protocol, length (патч заголовка)
+_ERR_RESP = struct.Struct('>HHHBBB')
+
+# Неизменяемый снимок состояния: писатель собирает новый и публикует его
+# одним присваиванием атрибута (атомарно под GIL), читатели берут ссылку
+# и работают без блокировки
+_Snapshot = namedtuple('_Snapshot', ['reg_bytes', 'json_bytes'])
+
+# Числовые коды типов датчиков: int8-сравнение в масках вместо
+# поэлементного сравнения юникодных строк
+_TYPE_CODES = {'temp': 0, 'humidity': 1, 'pressure': 2, 'power': 3}
+
+# Кэш скомпилированных форматов '>nH' по количеству регистров: опросы
+# ходят одними и теми же (start, count), формат компилируется однажды
+_REG_STRUCTS = {}
+
+def _reg_struct(count):
+    s = _REG_STRUCTS.get(count)
+    if s is None:
+        s = _REG_STRUCTS[count] = struct.Struct('>%dH' % count)
+    return s
+
 
 # ============================================================================
 # Sensor Data Manager  
 # ============================================================================
 class SensorDataManager:
     """Управление данными всех датчиков"""
-    
+
+    # Верхняя граница адресного пространства регистров (адреса < 4096)
+    MAX_REGISTER = 4096
+
     def __init__(self):
         self.sensors = {
             # Температурные датчики (регистры 1000-1006)
@@ -71,52 +119,143 @@ class SensorDataManager:
         
         self.scenario = 'normal'
         self.manual_mode = {}
-        self.lock = threading.Lock()
-    
+        # Мьютекс только для писателей (тик + ручные изменения из HTTP);
+        # читатели работают по опубликованному снимку без блокировок
+        self._mutation_lock = threading.Lock()
+
+        # SoA-зеркало таблицы датчиков: значения живут в параллельных
+        # numpy-массивах, так что update_values обновляет весь тик парой
+        # векторных операций вместо ~12 итераций Python-цикла.
+        # После инициализации _values - единственный источник значений;
+        # self.sensors хранит только метаданные (address/unit/type/...)
+        self._ids = list(self.sensors.keys())
+        self._n = len(self._ids)
+        self._index = {sid: i for i, sid in enumerate(self._ids)}
+        self._addresses = np.array([self.sensors[s]['address'] for s in self._ids], dtype=np.uint16)
+        self._type_ids = np.array([_TYPE_CODES[self.sensors[s]['type']] for s in self._ids], dtype=np.int8)
+        self._mins = np.array([self.sensors[s]['min'] for s in self._ids], dtype=np.float32)
+        self._maxs = np.array([self.sensors[s]['max'] for s in self._ids], dtype=np.float32)
+        self._values = np.array([self.sensors[s]['value'] for s in self._ids], dtype=np.float32)
+        # Булева маска ручного режима: держится синхронно с manual_mode,
+        # чтобы тик не пересобирал её из словаря
+        self._manual = np.zeros(len(self._ids), dtype=bool)
+        self._rng = np.random.default_rng()
+
+        # Маски по типам посчитаны один раз: тик не сравнивает строки
+        # типов по датчику, а сразу режет массивы готовыми масками.
+        # Диспетчеризация по сценарию живёт в _prepare_tick
+        self._temp_mask = self._type_ids == _TYPE_CODES['temp']
+        self._pressure_mask = self._type_ids == _TYPE_CODES['pressure']
+        self._power_mask = self._type_ids == _TYPE_CODES['power']
+
+        # Готовая big-endian карта всего регистрового пространства:
+        # перепаковывается раз за тик, а чтение по Modbus - это срез байт,
+        # без struct.pack на каждый регистр в каждом запросе.
+        # _reg_f32 - это big-endian float32-вид поверх той же памяти:
+        # обновление всех регистров сводится к одной векторной записи по
+        # индексам (адреса чётные, так что float ложится по границе 4 байт)
+        self._reg_bytes = bytearray(self.MAX_REGISTER * 2)
+        self._reg_f32 = np.frombuffer(self._reg_bytes, dtype='>f4')
+        self._f32_idx = self._addresses.astype(np.intp) // 2
+
+        # Опубликовать первый снимок: дальше читатели (Modbus и HTTP)
+        # обходятся вообще без блокировки, см. _publish
+        with self._mutation_lock:
+            self._publish()
+
+    def _refresh_registers(self):
+        """Перепаковать текущие значения в карту регистров (под self._mutation_lock)"""
+        self._reg_f32[self._f32_idx] = self._values
+
+    def _publish(self):
+        """Собрать и атомарно опубликовать снимок (под self._mutation_lock).
+
+        Снимок неизменяем (bytes), поэтому read_register_bytes и
+        get_json_bytes читают его без блокировки: данные меняются раз в
+        тик, а сериализация 12 датчиков дешевле, чем контеншн на мьютексе
+        между писателем и всеми опрашивающими клиентами.
+        """
+        self._refresh_registers()
+        self._snapshot = _Snapshot(bytes(self._reg_bytes),
+                                   _json_bytes(self._snapshot_dict()))
+
     def update_values(self):
-        """Автоматическое обновление значений"""
-        with self.lock:
-            for sensor_id, data in self.sensors.items():
-                if sensor_id in self.manual_mode:
-                    continue
-                
-                if self.scenario == 'fire':
-                    if data['type'] == 'temp':
-                        data['value'] = min(data['value'] + random.uniform(2.0, 5.0), 60.0)
-                    elif data['type'] == 'power':
-                        data['value'] = min(data['value'] + random.uniform(1.0, 3.0), 25.0)
-                
-                elif self.scenario == 'leak':
-                    if data['type'] == 'pressure':
-                        data['value'] = max(data['value'] - random.uniform(0.5, 1.5), 0.1)
-                    elif data['type'] == 'temp':
-                        data['value'] = max(data['value'] - random.uniform(0.5, 1.0), 5.0)
-                
-                elif self.scenario == 'power_failure':
-                    if data['type'] == 'power':
-                        data['value'] = max(data['value'] - random.uniform(2.0, 5.0), 0.0)
-                
-                else:  # normal
-                    trend = math.sin(time.time() / 10.0) * 0.5
-                    noise = random.uniform(-0.3, 0.3)
-                    new_value = data['value'] + trend + noise
-                    data['value'] = max(data['min'], min(data['max'], new_value))
+        """Автоматическое обновление значений (векторизованно)"""
+        # Случайные векторы тика генерируются ДО захвата блокировки:
+        # критическая секция - только применение готовых приращений
+        kernel, draws = self._prepare_tick()
+        with self._mutation_lock:
+            # Датчики в ручном режиме исключаются из автоматического тика
+            kernel(~self._manual, *draws)
+            self._publish()
+
+    def _prepare_tick(self):
+        """Выбрать ядро сценария и сгенерировать его случайные векторы.
+
+        Вызывается вне self._mutation_lock: чтение self.scenario атомарно под GIL,
+        а draws - полноразмерные векторы, ядро само режет их масками.
+        """
+        n = self._n
+        scenario = self.scenario
+        if scenario == 'fire':
+            return self._fire_step, (self._rng.uniform(2.0, 5.0, n),
+                                     self._rng.uniform(1.0, 3.0, n))
+        if scenario == 'leak':
+            return self._leak_step, (self._rng.uniform(0.5, 1.5, n),
+                                     self._rng.uniform(0.5, 1.0, n))
+        if scenario == 'power_failure':
+            return self._power_failure_step, (self._rng.uniform(2.0, 5.0, n),)
+        trend = np.float32(math.sin(time.time() / 10.0) * 0.5)
+        return self._normal_step, (trend, self._rng.uniform(-0.3, 0.3, n))
+
+    def _fire_step(self, auto, temp_delta, power_delta):
+        """Сценарий fire: рост температуры и мощности (под self._mutation_lock)"""
+        mask = auto & self._temp_mask
+        self._values[mask] = np.minimum(self._values[mask] + temp_delta[mask], 60.0)
+        mask = auto & self._power_mask
+        self._values[mask] = np.minimum(self._values[mask] + power_delta[mask], 25.0)
+
+    def _leak_step(self, auto, pressure_delta, temp_delta):
+        """Сценарий leak: падение давления и температуры (под self._mutation_lock)"""
+        mask = auto & self._pressure_mask
+        self._values[mask] = np.maximum(self._values[mask] - pressure_delta[mask], 0.1)
+        mask = auto & self._temp_mask
+        self._values[mask] = np.maximum(self._values[mask] - temp_delta[mask], 5.0)
+
+    def _power_failure_step(self, auto, power_delta):
+        """Сценарий power_failure: просадка мощности (под self._mutation_lock)"""
+        mask = auto & self._power_mask
+        self._values[mask] = np.maximum(self._values[mask] - power_delta[mask], 0.0)
+
+    def _normal_step(self, auto, trend, noise):
+        """Нормальный режим: тренд + шум в пределах min/max (под self._mutation_lock)"""
+        # Считаем прямо в буфере noise (он одноразовый на тик):
+        # ни одного временного массива внутри критической секции
+        np.add(noise, trend, out=noise)
+        np.add(noise, self._values, out=noise)
+        np.clip(noise, self._mins, self._maxs, out=noise)
+        self._values[auto] = noise[auto]
     
     def set_manual_value(self, sensor_id, value):
         """Установить значение вручную"""
-        with self.lock:
+        with self._mutation_lock:
             if sensor_id in self.sensors:
+                i = self._index[sensor_id]
                 self.manual_mode[sensor_id] = value
-                self.sensors[sensor_id]['value'] = value
+                self._manual[i] = True
+                self._values[i] = value
+                self._publish()
                 logger.info(f"🎮 Manual: {sensor_id} = {value} {self.sensors[sensor_id]['unit']}")
                 return True
         return False
     
     def clear_manual_value(self, sensor_id):
         """Снять ручной режим"""
-        with self.lock:
+        with self._mutation_lock:
             if sensor_id in self.manual_mode:
                 del self.manual_mode[sensor_id]
+                self._manual[self._index[sensor_id]] = False
+                self._publish()
                 logger.info(f"🔄 Auto mode restored: {sensor_id}")
                 return True
         return False
@@ -125,43 +264,59 @@ class SensorDataManager:
         """Установить сценарий"""
         valid_scenarios = ['normal', 'fire', 'leak', 'power_failure']
         if scenario in valid_scenarios:
-            with self.lock:
+            with self._mutation_lock:
                 self.scenario = scenario
                 self.manual_mode = {}
+                self._manual[:] = False
+                self._publish()
             logger.warning(f"⚠️ Scenario changed: {scenario.upper()}")
             return True
         return False
     
     def get_all_data(self):
         """Получить все данные для JSON"""
-        with self.lock:
-            return {
-                'timestamp': datetime.now().isoformat(),
-                'scenario': self.scenario,
-                'sensors': {
-                    sid: {
-                        'address': data['address'],
-                        'value': round(data['value'], 2),
-                        'unit': data['unit'],
-                        'type': data['type'],
-                        'manual': sid in self.manual_mode
-                    }
-                    for sid, data in self.sensors.items()
+        with self._mutation_lock:
+            return self._snapshot_dict()
+
+    def get_json_bytes(self):
+        """Сериализованный снимок для /api/sensors (без блокировки).
+
+        Байты пересобираются раз за изменение данных в _publish, а не на
+        каждый опрос каждого браузера.
+        """
+        return self._snapshot.json_bytes
+
+    def _snapshot_dict(self):
+        """Собрать словарь-снимок (вызывать под self._mutation_lock)"""
+        values = self._values
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'scenario': self.scenario,
+            'sensors': {
+                sid: {
+                    'address': data['address'],
+                    'value': round(float(values[self._index[sid]]), 2),
+                    'unit': data['unit'],
+                    'type': data['type'],
+                    'manual': sid in self.manual_mode
                 }
+                for sid, data in self.sensors.items()
             }
+        }
     
+    def read_register_bytes(self, start_address, count):
+        """Чтение Modbus регистров готовыми big-endian байтами (без блокировки).
+
+        Карта плотная по адресному пространству, поэтому любой (start,
+        count) - это срез по арифметике адресов за O(1); фильтрации по
+        списку адресов, которую имело бы смысл мемоизировать, здесь нет.
+        """
+        return self._snapshot.reg_bytes[start_address * 2:(start_address + count) * 2]
+
     def read_registers(self, start_address, count):
-        """Чтение Modbus регистров"""
-        registers = []
-        with self.lock:
-            for sensor_id, data in self.sensors.items():
-                addr = data['address']
-                if start_address <= addr < start_address + count * 2:
-                    value_bytes = struct.pack('>f', data['value'])
-                    reg1, reg2 = struct.unpack('>HH', value_bytes)
-                    registers.extend([reg1, reg2])
-        
-        return registers[:count]
+        """Чтение Modbus регистров списком uint16"""
+        raw = self.read_register_bytes(start_address, count)
+        return list(_reg_struct(len(raw) // 2).unpack(raw))
 
 
 # ============================================================================
@@ -175,89 +330,188 @@ class ModbusTCPServer:
         self.port = port
         self.data_manager = data_manager
         self.running = False
-        self.server_socket = None
-    
+        self._sockets = []
+        # TCP_QUICKACK есть только на Linux; на других платформах
+        # ограничиваемся NODELAY + KEEPALIVE
+        self._quickack = getattr(socket, 'TCP_QUICKACK', None)
+
     def start(self):
-        """Запустить сервер"""
+        """Запустить сервер: событийные циклы на selectors.
+
+        Один поток + epoll вместо потока ОС на каждого клиента: сотни
+        опрашивающих SCADA-клиентов обходятся в O(клиентов) памяти на
+        буферы, а не в стек потока (~8 МБ) и борьбу за GIL на каждого.
+        При MODBUS_WORKERS > 1 поднимается несколько слушающих сокетов
+        с SO_REUSEPORT: ядро само балансирует входящие соединения между
+        независимыми accept/epoll-циклами.
+        """
+        reuseport = getattr(socket, 'SO_REUSEPORT', None)
+        workers = int(os.environ.get('MODBUS_WORKERS', 1))
+        if workers > 1 and reuseport is None:
+            logger.warning("⚠️ SO_REUSEPORT недоступен - запускаем один цикл")
+            workers = 1
+
         try:
-            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            self.server_socket.bind((self.host, self.port))
-            self.server_socket.listen(5)
-            self.running = True
-            
-            logger.info(f"✅ Modbus TCP Server Started")
-            logger.info(f"📡 Listening on {self.host}:{self.port}")
-            
-            while self.running:
-                try:
-                    client_socket, address = self.server_socket.accept()
-                    threading.Thread(
-                        target=self.handle_client,
-                        args=(client_socket, address),
-                        daemon=True
-                    ).start()
-                except Exception as e:
-                    if self.running:
-                        logger.error(f"❌ Accept error: {e}")
+            for _ in range(workers):
+                s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                if workers > 1:
+                    s.setsockopt(socket.SOL_SOCKET, reuseport, 1)
+                s.bind((self.host, self.port))
+                s.listen(128)
+                s.setblocking(False)
+                self._sockets.append(s)
         except Exception as e:
             logger.error(f"❌ Failed to start Modbus server: {e}")
-    
-    def handle_client(self, client_socket, address):
-        """Обработка клиента"""
-        logger.info(f"🔌 Modbus client connected: {address[0]}:{address[1]}")
-        
+            return
+
+        self.running = True
+        logger.info(f"✅ Modbus TCP Server Started ({workers} worker(s))")
+        logger.info(f"📡 Listening on {self.host}:{self.port}")
+
+        for extra in self._sockets[1:]:
+            threading.Thread(target=self._serve, args=(extra,), daemon=True).start()
+        self._serve(self._sockets[0])
+
+    def _serve(self, server_socket):
+        """Событийный цикл одного воркера (свой selector на поток)"""
+        selector = selectors.DefaultSelector()
+        selector.register(server_socket, selectors.EVENT_READ, None)
         try:
             while self.running:
-                data = client_socket.recv(1024)
-                if not data:
-                    break
-                
-                response = self.process_modbus_request(data)
-                client_socket.send(response)
-        
+                for key, _ in selector.select(timeout=1.0):
+                    if key.data is None:
+                        self._accept(selector, key.fileobj)
+                    else:
+                        self._service(selector, key.fileobj, key.data)
         except Exception as e:
-            logger.error(f"❌ Client error: {e}")
+            if self.running:
+                logger.error(f"❌ Modbus worker error: {e}")
         finally:
-            client_socket.close()
-            logger.info(f"🔌 Modbus client disconnected: {address[0]}")
-    
-    def process_modbus_request(self, data):
-        """Обработка Modbus запроса"""
+            selector.close()
+
+    def _accept(self, selector, server_socket):
+        """Принять соединение и зарегистрировать его в селекторе"""
+        try:
+            client_socket, address = server_socket.accept()
+        except OSError as e:
+            if self.running:
+                logger.error(f"❌ Accept error: {e}")
+            return
+
+        client_socket.setblocking(False)
+        # Nagle + delayed ACK на крошечных ответах дают задержки до ~40 мс;
+        # ответ и так упакован в один send, коалесцировать нечего
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        if self._quickack is not None:
+            client_socket.setsockopt(socket.IPPROTO_TCP, self._quickack, 1)
+        # Буферы соединения: rx - приёмный (recv_into пишет в него без
+        # аллокации bytes на каждый recv), buf - накопитель кадров
+        # (кадры могут приходить частями), out - переиспользуемый буфер
+        # ответа: заголовок + до 125 регистров, пакуется без аллокаций
+        selector.register(client_socket, selectors.EVENT_READ,
+                          {'addr': address, 'buf': bytearray(),
+                           'rx': memoryview(bytearray(4096)),
+                           'out': memoryview(bytearray(9 + 2 * 125))})
+        logger.info(f"🔌 Modbus client connected: {address[0]}:{address[1]}")
+
+    def _service(self, selector, client_socket, state):
+        """Прочитать доступные байты и ответить на все готовые кадры"""
+        rx = state['rx']
+        try:
+            # recv_into: ядро пишет прямо в постоянный буфер соединения,
+            # без свежего bytes-объекта на каждый recv
+            received = client_socket.recv_into(rx)
+        except BlockingIOError:
+            return
+        except OSError:
+            received = 0
+
+        if not received:
+            self._disconnect(selector, client_socket, state)
+            return
+
+        buf = state['buf']
+        buf += rx[:received]
+
+        try:
+            # MBAP: transaction(2) + protocol(2) + length(2), затем length байт
+            while len(buf) >= 6:
+                frame_len = 6 + _U16.unpack_from(buf, 4)[0]
+                if len(buf) < frame_len:
+                    break
+                frame = bytes(buf[:frame_len])
+                del buf[:frame_len]
+
+                if len(frame) < 8:
+                    # Кадр короче unit+function - протокол сломан, рвём связь
+                    self._disconnect(selector, client_socket, state)
+                    return
+
+                # Ответы крошечные (<300 байт), целиком помещаются в
+                # буфер отправки; sendall гарантирует полную запись
+                n = self.process_modbus_request(frame, state['out'])
+                client_socket.sendall(state['out'][:n])
+
+            if len(buf) > 65536:
+                # Накопился мусор без единого полного кадра - не даём
+                # буферу соединения расти бесконечно
+                self._disconnect(selector, client_socket, state)
+        except OSError as e:
+            logger.error(f"❌ Client error: {e}")
+            self._disconnect(selector, client_socket, state)
+
+    def _disconnect(self, selector, client_socket, state):
+        """Снять клиента с регистрации и закрыть сокет"""
+        try:
+            selector.unregister(client_socket)
+        except (KeyError, ValueError):
+            pass
+        client_socket.close()
+        logger.info(f"🔌 Modbus client disconnected: {state['addr'][0]}")
+    
+    def process_modbus_request(self, data, out):
+        """Обработка Modbus запроса: пакует ответ в out, возвращает длину"""
         if len(data) < 12:
-            return self.error_response(data, 0x01)
-        
-        transaction_id = struct.unpack('>H', data[0:2])[0]
-        protocol_id = struct.unpack('>H', data[2:4])[0]
-        unit_id = data[6]
-        function_code = data[7]
-        
+            return self.error_response(data, out, 0x01)
+
+        transaction_id, protocol_id, _length, unit_id, function_code = _MBAP.unpack_from(data, 0)
+
         if function_code == 0x03:
-            start_address = struct.unpack('>H', data[8:10])[0]
-            count = struct.unpack('>H', data[10:12])[0]
-            
-            registers = self.data_manager.read_registers(start_address, count)
-            
-            byte_count = len(registers) * 2
-            response = struct.pack('>HHHBB', transaction_id, protocol_id, byte_count + 3, unit_id, function_code)
-            response += struct.pack('B', byte_count)
-            for reg in registers:
-                response += struct.pack('>H', reg)
-            
-            return response
-        
-        return self.error_response(data, 0x01)
-    
-    def error_response(self, request, exception_code):
-        """Ошибка Modbus"""
-        transaction_id = struct.unpack('>H', request[0:2])[0]
-        return struct.pack('>HHHBBB', transaction_id, 0, 3, request[6], request[7] | 0x80, exception_code)
+            start_address, count = _FC03.unpack_from(data, 8)
+            if count == 0 or count > 125:
+                # Modbus ограничивает FC03 125 регистрами; заодно это
+                # гарантирует, что ответ влезает в буфер соединения
+                return self.error_response(data, out, 0x03)
+
+            # Регистры уже лежат готовыми big-endian байтами в карте:
+            # ответ - это заголовок + один срез, без цикла struct.pack
+            payload = self.data_manager.read_register_bytes(start_address, count)
+
+            byte_count = len(payload)
+            _HDR3.pack_into(out, 0, transaction_id, protocol_id, byte_count + 3)
+            out[6] = unit_id
+            out[7] = 0x03
+            out[8] = byte_count
+            out[9:9 + byte_count] = payload
+            return 9 + byte_count
+
+        return self.error_response(data, out, 0x01)
+
+    def error_response(self, request, out, exception_code):
+        """Ошибка Modbus: пакует ответ в out, возвращает длину"""
+        transaction_id = _U16.unpack_from(request, 0)[0]
+        _ERR_RESP.pack_into(out, 0, transaction_id, 0, 3,
+                            request[6], request[7] | 0x80, exception_code)
+        return _ERR_RESP.size
     
     def stop(self):
         """Остановить сервер"""
         self.running = False
-        if self.server_socket:
-            self.server_socket.close()
+        for s in self._sockets:
+            s.close()
+        self._sockets = []
 
 
 # ============================================================================
@@ -305,9 +559,7 @@ class WebUIHandler(BaseHTTPRequestHandler):
         else:
             self.send_error(404)
     
-    def serve_dashboard(self):
-        """Главная страница Dashboard - SAME AS BEFORE"""
-        html = """<!DOCTYPE html>
+    _DASHBOARD_HTML = """<!DOCTYPE html>
 <html lang="ru">
 <head>
     <meta charset="UTF-8">
@@ -542,22 +794,35 @@ class WebUIHandler(BaseHTTPRequestHandler):
     </script>
 </body>
 </html>"""
-        
+
+    # Кодируется и сжимается один раз при создании класса, а не на каждый
+    # GET; известная длина позволяет отдавать Content-Length для keep-alive
+    _DASHBOARD = _DASHBOARD_HTML.encode('utf-8')
+    _DASHBOARD_GZ = gzip.compress(_DASHBOARD, 9)
+
+    def serve_dashboard(self):
+        """Главная страница Dashboard - отдаёт преднарезанные байты"""
+        gz = 'gzip' in self.headers.get('Accept-Encoding', '')
+        body = self._DASHBOARD_GZ if gz else self._DASHBOARD
         self.send_response(200)
         self.send_header('Content-Type', 'text/html; charset=utf-8')
+        if gz:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
         self.end_headers()
-        self.wfile.write(html.encode('utf-8'))
-    
+        self.wfile.write(body)
+
     def serve_sensor_data(self):
-        """API: Получить данные датчиков"""
-        data = self.data_manager.get_all_data()
-        self.send_json_response(data)
+        """API: Получить данные датчиков (кешированные байты)"""
+        self.send_json_bytes(self.data_manager.get_json_bytes())
     
     def serve_status(self):
         """API: Статус системы"""
         status = {
             'status': 'online',
-            'timestamp': datetime.now().isoformat(),
+            # Эпоха в миллисекундах: один дешёвый вызов C вместо
+            # datetime.now() + isoformat() на каждый опрос
+            'timestamp': int(time.time() * 1000),
             'modbus_port': 5020,
             'web_port': int(os.environ.get('PORT', 8080))
         }
@@ -592,10 +857,15 @@ class WebUIHandler(BaseHTTPRequestHandler):
     
     def send_json_response(self, data):
         """Отправить JSON ответ"""
+        self.send_json_bytes(_json_bytes(data))
+
+    def send_json_bytes(self, body):
+        """Отправить готовые JSON-байты с Content-Length"""
         self.send_response(200)
         self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode('utf-8'))
+        self.wfile.write(body)
     
     def log_message(self, format, *args):
         """Подавить лишние логи"""
@@ -629,8 +899,11 @@ def main():
     modbus_thread = threading.Thread(target=modbus_server.start, daemon=True)
     modbus_thread.start()
     
-    # Запустить Web UI сервер на Railway PORT
-    web_server = HTTPServer(('0.0.0.0', railway_port), WebUIHandler)
+    # Запустить Web UI сервер на Railway PORT.
+    # ThreadingHTTPServer: медленный клиент не блокирует остальных,
+    # а ответы - это заранее готовые байты снимка, хендлер тривиален
+    web_server = ThreadingHTTPServer(('0.0.0.0', railway_port), WebUIHandler)
+    web_server.daemon_threads = True
     logger.info(f"✅ Web Dashboard Started on Railway PORT")
     logger.info(f"🌐 Access via Railway public URL")
     logger.info(f"📡 API endpoints: /api/sensors, /api/status")
@@ -639,12 +912,23 @@ def main():
     web_thread = threading.Thread(target=web_server.serve_forever, daemon=True)
     web_thread.start()
     
-    # Основной цикл обновления данных
+    # Основной цикл обновления данных: абсолютный дедлайн по монотонным
+    # часам, чтобы тик держал ровно 1 Гц и не дрейфовал на стоимость
+    # update_values (от стабильного шага зависит синусоидальный тренд)
+    tick = 1.0
+    deadline = time.monotonic()
     try:
         while True:
             data_manager.update_values()
-            time.sleep(1.0)
-    
+            deadline += tick
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Тик не уложился в секунду - переустанавливаем дедлайн,
+                # а не пытаемся догнать пачкой мгновенных обновлений
+                deadline = time.monotonic()
+
     except KeyboardInterrupt:
         logger.info("\n🛑 Shutting down...")
         modbus_server.stop()
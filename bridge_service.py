@@ -6,9 +6,12 @@ This allows emulator to continue using its own schema while feeding data to main
 """
 
 import psycopg2
+from psycopg2.extras import execute_values
 import os
+import select
 import time
 from datetime import datetime, timedelta
+from urllib.parse import urlsplit, unquote
 
 def get_db_config():
     """Get database configuration from environment variables"""
@@ -20,17 +23,17 @@ def get_db_config():
             'user': os.environ.get('POSTGRES_USER', 'postgres'),
             'password': os.environ.get('POSTGRES_PASSWORD', '')
         }
+    # urlsplit handles percent-encoding and special characters in the
+    # password, unlike the old hand-rolled regex
     elif os.environ.get('DATABASE_URL'):
-        url = os.environ['DATABASE_URL']
-        import re
-        match = re.match(r'postgresql://([^:]+):([^@]+)@([^:]+):(\d+)/(.+)', url)
-        if match:
+        parts = urlsplit(os.environ['DATABASE_URL'])
+        if parts.scheme.startswith('postgres'):
             return {
-                'user': match.group(1),
-                'password': match.group(2),
-                'host': match.group(3),
-                'port': match.group(4),
-                'database': match.group(5)
+                'user': unquote(parts.username) if parts.username else 'postgres',
+                'password': unquote(parts.password) if parts.password else '',
+                'host': parts.hostname or 'localhost',
+                'port': str(parts.port or 5432),
+                'database': parts.path.lstrip('/') or 'railway'
             }
     return {
         'host': 'localhost',
@@ -56,15 +59,33 @@ class DataBridge:
         self.conn = None
         self.cursor = None
         self.sensor_map = {}
+        self.resolved = {}
         self.last_sync_time = None
+        # Keyset cursor: (last_sync_time, last_sync_id) of the last row
+        # handled, so rows sharing a timestamp are never re-fetched
+        self.last_sync_id = 0
         
     def connect(self):
         """Connect to database"""
         try:
             config = get_db_config()
             self.conn = psycopg2.connect(**config)
-            self.conn.autocommit = True
             self.cursor = self.conn.cursor()
+            # The generator's statement-level trigger fires one NOTIFY
+            # per insert batch; listening lets the sync loop wake on
+            # data instead of blind-polling on a timer. Commit right
+            # away: notifications are only delivered outside a
+            # transaction, so the connection must return to idle
+            self.cursor.execute("LISTEN sensor_insert")
+            # Covering index for the sync SELECT below: the keyset scan
+            # becomes index-only instead of seqscan + sort. IF NOT EXISTS
+            # makes this a no-op after the first run
+            self.cursor.execute("""
+                CREATE INDEX IF NOT EXISTS sr_ts_idx
+                ON sensor_readings (timestamp, sensor_id)
+                INCLUDE (temperature, humidity, co2, pressure, building_id)
+            """)
+            self.conn.commit()
             print(f"✅ Connected to {config['database']}")
             return True
         except Exception as e:
@@ -119,11 +140,14 @@ class DataBridge:
                 'co2': [s[0] for s in co2_sensors],
                 'pressure': [s[0] for s in pressure_sensors]
             }
-            
+            self._build_resolved()
+            self.conn.commit()
+
             return True
-            
+
         except Exception as e:
             print(f"❌ Error setting up sensor mapping: {e}")
+            self.conn.rollback()
             return False
     
     def _create_automatic_mapping(self):
@@ -134,8 +158,21 @@ class DataBridge:
             'co2': [],
             'pressure': []
         }
+        self._build_resolved()
+        self.conn.commit()
         print("⚠️  Using empty sensor mapping (no data will be synced)")
         return True
+
+    def _build_resolved(self):
+        """Precompute (sensor_type, building_id) → Django sensor id"""
+        # The round-robin choice per building never changes after mapping
+        # setup, so resolve it once here; the hot path is then a single
+        # dict lookup instead of list len + modulo per metric per reading
+        self.resolved = {
+            (sensor_type, building_id): sensors[building_id % len(sensors)]
+            for sensor_type, sensors in self.sensor_map.items() if sensors
+            for building_id in range(1, 6)
+        }
     
     def sync_data(self, time_window_minutes=5):
         """
@@ -144,104 +181,141 @@ class DataBridge:
         Args:
             time_window_minutes: Sync readings from last N minutes
         """
+        # Get timestamp of last sync
+        if self.last_sync_time is None:
+            self.last_sync_time = datetime.now() - timedelta(minutes=time_window_minutes)
+
+        # The pass advances the keyset cursor row by row; snapshot it so
+        # a failed (rolled-back) pass can rewind and the next pass
+        # re-reads everything the database rolled back
+        keyset = (self.last_sync_time, self.last_sync_id)
+
         try:
-            # Get timestamp of last sync
-            if self.last_sync_time is None:
-                self.last_sync_time = datetime.now() - timedelta(minutes=time_window_minutes)
-            
-            # Read from emulator sensor_readings
-            self.cursor.execute("""
-                SELECT sensor_id, timestamp, temperature, humidity, co2, pressure, building_id
-                FROM sensor_readings
-                WHERE timestamp > %s
-                ORDER BY timestamp ASC
-            """, (self.last_sync_time,))
-            
-            readings = self.cursor.fetchall()
-            
-            if not readings:
-                print(f"⏱️  No new readings since {self.last_sync_time}")
-                return 0
-            
-            print(f"📊 Found {len(readings)} new readings to sync")
-            
-            # Group readings by type and write to Django data_data
-            synced_count = 0
-            
-            for reading in readings:
-                sensor_id, timestamp, temp, humidity, co2, pressure, building_id = reading
-                
-                # Sync temperature
-                if temp is not None and self.sensor_map.get('temperature'):
-                    django_sensor_id = self._get_django_sensor(building_id, 'temperature')
-                    if django_sensor_id:
-                        self._write_django_data(django_sensor_id, float(temp), timestamp)
-                        synced_count += 1
-                
-                # Sync humidity
-                if humidity is not None and self.sensor_map.get('humidity'):
-                    django_sensor_id = self._get_django_sensor(building_id, 'humidity')
-                    if django_sensor_id:
-                        self._write_django_data(django_sensor_id, float(humidity), timestamp)
-                        synced_count += 1
-                
-                # Sync CO2
-                if co2 is not None and self.sensor_map.get('co2'):
-                    django_sensor_id = self._get_django_sensor(building_id, 'co2')
-                    if django_sensor_id:
-                        self._write_django_data(django_sensor_id, float(co2), timestamp)
-                        synced_count += 1
-                
-                # Sync pressure
-                if pressure is not None and self.sensor_map.get('pressure'):
-                    django_sensor_id = self._get_django_sensor(building_id, 'pressure')
-                    if django_sensor_id:
-                        self._write_django_data(django_sensor_id, float(pressure), timestamp)
-                        synced_count += 1
-            
-            # Update last sync time
-            self.last_sync_time = readings[-1][1]  # timestamp of last reading
-            
-            print(f"✅ Synced {synced_count} data points to Django database")
-            return synced_count
-            
+            # One explicit transaction per sync pass: every batch flush
+            # below shares a single commit (one WAL flush per pass, and
+            # a failed pass rolls back as a unit). The with-block also
+            # returns the connection to idle so NOTIFY delivery works
+            # while the loop waits in select()
+            with self.conn:
+                return self._sync_pass()
+
         except Exception as e:
             print(f"❌ Sync error: {e}")
+            self.last_sync_time, self.last_sync_id = keyset
+            return 0
+
+    def _sync_pass(self):
+        """One read+flush pass inside the caller's transaction"""
+        # Stream from emulator sensor_readings with a server-side
+        # cursor: a catch-up after downtime can return tens of
+        # thousands of rows, and fetchall would hold them all in
+        # memory before any work starts. WITH HOLD so the stream
+        # would survive an intermediate commit
+        read_cursor = self.conn.cursor(name='sync_stream', withhold=True)
+        read_cursor.itersize = 2000
+        # Keyset pagination on (timestamp, sensor_id): strictly after the
+        # last row seen, so two rows sharing a timestamp are neither
+        # skipped nor synced twice across passes
+        read_cursor.execute("""
+            SELECT sensor_id, timestamp, temperature, humidity, co2, pressure, building_id
+            FROM sensor_readings
+            WHERE (timestamp, sensor_id) > (%s, %s)
+            ORDER BY timestamp ASC, sensor_id ASC
+        """, (self.last_sync_time, self.last_sync_id))
+
+        # Collect rows and flush in batches: memory stays bounded at
+        # the batch size and each flush is one execute_values
+        found = 0
+        synced_count = 0
+        rows = []
+
+        # Bind attribute and method lookups once; the loop body runs
+        # four times per reading and a catch-up sync can cover tens
+        # of thousands of readings. The mapping never changes during
+        # a sync pass, so the per-type gates collapse to booleans
+        resolved_get = self.resolved.get
+        rows_append = rows.append
+        want_temp = bool(self.sensor_map.get('temperature'))
+        want_humidity = bool(self.sensor_map.get('humidity'))
+        want_co2 = bool(self.sensor_map.get('co2'))
+        want_pressure = bool(self.sensor_map.get('pressure'))
+
+        for reading in read_cursor:
+            found += 1
+            sensor_id, timestamp, temp, humidity, co2, pressure, building_id = reading
+
+            # Sync temperature
+            if want_temp and temp is not None:
+                django_sensor_id = resolved_get(('temperature', building_id))
+                if django_sensor_id:
+                    rows_append((float(temp), timestamp, django_sensor_id))
+
+            # Sync humidity
+            if want_humidity and humidity is not None:
+                django_sensor_id = resolved_get(('humidity', building_id))
+                if django_sensor_id:
+                    rows_append((float(humidity), timestamp, django_sensor_id))
+
+            # Sync CO2
+            if want_co2 and co2 is not None:
+                django_sensor_id = resolved_get(('co2', building_id))
+                if django_sensor_id:
+                    rows_append((float(co2), timestamp, django_sensor_id))
+
+            # Sync pressure
+            if want_pressure and pressure is not None:
+                django_sensor_id = resolved_get(('pressure', building_id))
+                if django_sensor_id:
+                    rows_append((float(pressure), timestamp, django_sensor_id))
+
+            # Advance the keyset cursor as we go
+            self.last_sync_time = timestamp
+            self.last_sync_id = sensor_id
+
+            if len(rows) >= 500:
+                self._flush_django_data(rows)
+                synced_count += len(rows)
+                # Clear in place so rows_append stays bound
+                del rows[:]
+
+        read_cursor.close()
+
+        if not found:
+            print(f"⏱️  No new readings since {self.last_sync_time}")
             return 0
+
+        if rows:
+            self._flush_django_data(rows)
+            synced_count += len(rows)
+
+        print(f"✅ Synced {synced_count} data points from {found} readings to Django database")
+        return synced_count
     
     def _get_django_sensor(self, building_id, sensor_type):
         """Get Django sensor ID for given building and type"""
-        sensors = self.sensor_map.get(sensor_type, [])
-        if not sensors:
-            return None
-        
-        # Simple round-robin mapping based on building_id
-        idx = building_id % len(sensors)
-        return sensors[idx]
-    
-    def _write_django_data(self, django_sensor_id, value, timestamp):
-        """Write data point to Django data_data table"""
-        try:
-            self.cursor.execute("""
-                INSERT INTO data_data (created_at, updated_at, value, date, name_id)
-                VALUES (NOW(), NOW(), %s, %s, %s)
-            """, (value, timestamp, django_sensor_id))
-            return True
-        except Exception as e:
-            print(f"❌ Write error for sensor {django_sensor_id}: {e}")
-            return False
+        return self.resolved.get((sensor_type, building_id))
+
+    def _flush_django_data(self, rows):
+        """Write a batch of (value, date, name_id) rows to data_data"""
+        execute_values(self.cursor, """
+            INSERT INTO data_data (created_at, updated_at, value, date, name_id)
+            VALUES %s
+        """, rows, template="(NOW(), NOW(), %s, %s, %s)", page_size=500)
     
     def run_continuous_sync(self, interval_seconds=30):
-        """Run continuous sync loop"""
-        print(f"\n🔄 Starting continuous sync (interval: {interval_seconds}s)")
+        """Run continuous sync loop, woken by NOTIFY from the generator"""
+        print(f"\n🔄 Starting continuous sync (NOTIFY-driven, fallback: {interval_seconds}s)")
         print("   Press Ctrl+C to stop\n")
-        
+
         while True:
             try:
-                synced = self.sync_data()
-                if synced > 0:
-                    print(f"⏱️  Waiting {interval_seconds}s for next sync...\n")
-                time.sleep(interval_seconds)
+                self.sync_data()
+                # Sleep until the generator inserts (NOTIFY) or the
+                # fallback interval passes — covers a missing trigger
+                if select.select([self.conn], [], [], interval_seconds)[0]:
+                    self.conn.poll()
+                    # Collapse queued notifications into one sync pass
+                    del self.conn.notifies[:]
             except KeyboardInterrupt:
                 print("\n⚠️  Stopping sync service...")
                 break
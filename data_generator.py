@@ -5,11 +5,22 @@ Generates sensor readings every 10 seconds for real-time simulation
 """
 
 import psycopg2
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
+from contextlib import contextmanager
+import csv
+import io
 import os
+import sys
 import time
 import random
+import numpy as np
 from datetime import datetime
 
+# Bound once: skips the module attribute walk to the hidden global
+# Random instance on every draw in the non-vectorized path
+_uniform = random.uniform
+
 # Global scenario state (will be synced from app.py)
 ACTIVE_SCENARIOS = {
     'temperature_spike': {'active': False, 'building_id': None, 'intensity': 10},
@@ -18,16 +29,21 @@ ACTIVE_SCENARIOS = {
     'equipment_failure': {'active': False, 'building_id': None, 'failed_sensors': []}
 }
 
+# Cached reference to the app module once it has been seen in
+# sys.modules; app rebinds SCENARIO_STATE to a fresh immutable snapshot
+# on every change, so the attribute itself must be re-read each sync
+_APP_MODULE = None
+
 def sync_scenarios_from_app():
     """Sync scenarios from app.py SCENARIO_STATE if available"""
-    try:
-        import sys
-        if 'app' in sys.modules:
-            from app import SCENARIO_STATE
-            global ACTIVE_SCENARIOS
-            ACTIVE_SCENARIOS = SCENARIO_STATE
-    except:
-        pass
+    global _APP_MODULE, ACTIVE_SCENARIOS
+    if _APP_MODULE is None:
+        _APP_MODULE = sys.modules.get('app')
+        if _APP_MODULE is None:
+            return
+    state = getattr(_APP_MODULE, 'SCENARIO_STATE', None)
+    if state is not None:
+        ACTIVE_SCENARIOS = state
 
 def get_db_config():
     """Get database configuration from environment variables"""
@@ -54,21 +70,47 @@ def get_db_connection():
     conn.autocommit = True
     return conn
 
-def generate_sensor_reading(sensor_id, building_id, controller_id):
+# Lazily created pool: a fresh TCP + auth handshake per 10-second tick
+# is pure overhead, so insert/cleanup reuse pooled connections instead.
+# Created on first use rather than at import so importing this module
+# (app.py does) never opens database connections by itself
+_POOL = None
+
+def _get_pool():
+    global _POOL
+    if _POOL is None:
+        _POOL = ThreadedConnectionPool(1, 8, **get_db_config())
+    return _POOL
+
+@contextmanager
+def borrow_connection():
+    """Borrow a pooled connection and return it to the pool on exit"""
+    pool = _get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+    except Exception:
+        # Never return a connection with an aborted transaction open
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+
+# Base values for each building, indexed by building_id (1-5)
+BASE_TEMPS = (None, 20, 21, 23, 25, 26)
+BASE_HUMIDITY = (None, 47, 49, 51, 53, 55)
+
+def generate_sensor_reading(sensor_id, building_id, controller_id, timestamp=None):
     """Generate realistic sensor reading with scenario effects"""
-    
+
     # Sync scenarios from app.py
     sync_scenarios_from_app()
-    
-    # Base values for each building
-    base_temps = {1: 20, 2: 21, 3: 23, 4: 25, 5: 26}
-    base_humidity = {1: 47, 2: 49, 3: 51, 4: 53, 5: 55}
-    
+
     # Normal readings with small variations
-    temperature = base_temps[building_id] + random.uniform(-2, 2)
-    humidity = base_humidity[building_id] + random.uniform(-5, 5)
-    co2 = random.uniform(400, 600)
-    pressure = random.uniform(990, 1020)
+    temperature = BASE_TEMPS[building_id] + _uniform(-2, 2)
+    humidity = BASE_HUMIDITY[building_id] + _uniform(-5, 5)
+    co2 = _uniform(400, 600)
+    pressure = _uniform(990, 1020)
     
     # Apply active scenarios (building-level)
     temp_scenario = ACTIVE_SCENARIOS.get('temperature_spike', {})
@@ -89,10 +131,10 @@ def generate_sensor_reading(sensor_id, building_id, controller_id):
     failure_scenario = ACTIVE_SCENARIOS.get('equipment_failure', {})
     if failure_scenario.get('active') and failure_scenario.get('building_id') == building_id:
         # Equipment failure: erratic readings
-        temperature += random.uniform(-10, 10)
-        humidity = random.uniform(0, 100)
-        co2 = random.uniform(0, 2000)
-        pressure = random.uniform(900, 1100)
+        temperature += _uniform(-10, 10)
+        humidity = _uniform(0, 100)
+        co2 = _uniform(0, 2000)
+        pressure = _uniform(900, 1100)
     
     return {
         'sensor_id': sensor_id,
@@ -102,77 +144,182 @@ def generate_sensor_reading(sensor_id, building_id, controller_id):
         'pressure': round(pressure, 2),
         'building_id': building_id,
         'controller_id': controller_id,
-        'timestamp': datetime.now()
+        'timestamp': timestamp if timestamp is not None else datetime.now()
     }
 
+# 5 buildings, each with different number of controllers and sensors;
+# the layout is static, so it lives at module scope together with the
+# arrays the vectorized generation pass slices every tick
+SENSORS_CONFIG = (
+    # Building 1: 3 controllers, 12 sensors (4 per controller)
+    *[(1, 1, s) for s in range(1, 5)],
+    *[(1, 2, s) for s in range(5, 9)],
+    *[(1, 3, s) for s in range(9, 13)],
+
+    # Building 2: 3 controllers, 12 sensors
+    *[(2, 4, s) for s in range(13, 17)],
+    *[(2, 5, s) for s in range(17, 21)],
+    *[(2, 6, s) for s in range(21, 25)],
+
+    # Building 3: 3 controllers, 12 sensors
+    *[(3, 7, s) for s in range(25, 29)],
+    *[(3, 8, s) for s in range(29, 33)],
+    *[(3, 9, s) for s in range(33, 37)],
+
+    # Building 4: 2 controllers, 8 sensors
+    *[(4, 10, s) for s in range(37, 41)],
+    *[(4, 11, s) for s in range(41, 45)],
+
+    # Building 5: 2 controllers, 8 sensors
+    *[(5, 12, s) for s in range(45, 49)],
+    *[(5, 13, s) for s in range(49, 53)],
+)
+
+_N = len(SENSORS_CONFIG)
+_BUILDING_IDS = np.array([b for b, c, s in SENSORS_CONFIG])
+_CONTROLLER_IDS = [c for b, c, s in SENSORS_CONFIG]
+_SENSOR_IDS = [s for b, c, s in SENSORS_CONFIG]
+_BASE_T = np.array([BASE_TEMPS[b] for b, c, s in SENSORS_CONFIG])
+_BASE_H = np.array([BASE_HUMIDITY[b] for b, c, s in SENSORS_CONFIG])
+_RNG = np.random.default_rng()
+
 def generate_all_sensors():
-    """Generate readings for all 50 sensors"""
-    
-    # 5 buildings, each with different number of controllers and sensors
-    sensors_config = [
-        # Building 1: 3 controllers, 12 sensors (4 per controller)
-        *[(1, 1, s) for s in range(1, 5)],
-        *[(1, 2, s) for s in range(5, 9)],
-        *[(1, 3, s) for s in range(9, 13)],
-        
-        # Building 2: 3 controllers, 12 sensors
-        *[(2, 4, s) for s in range(13, 17)],
-        *[(2, 5, s) for s in range(17, 21)],
-        *[(2, 6, s) for s in range(21, 25)],
-        
-        # Building 3: 3 controllers, 12 sensors
-        *[(3, 7, s) for s in range(25, 29)],
-        *[(3, 8, s) for s in range(29, 33)],
-        *[(3, 9, s) for s in range(33, 37)],
-        
-        # Building 4: 2 controllers, 8 sensors
-        *[(4, 10, s) for s in range(37, 41)],
-        *[(4, 11, s) for s in range(41, 45)],
-        
-        # Building 5: 2 controllers, 8 sensors
-        *[(5, 12, s) for s in range(45, 49)],
-        *[(5, 13, s) for s in range(49, 53)],
+    """Generate readings for all 50 sensors in one vectorized pass"""
+
+    # Scenario state changes at most once per tick; sync once here
+    # instead of once per sensor
+    sync_scenarios_from_app()
+
+    ts = datetime.now()
+
+    # One vectorized draw per metric instead of 4 random.uniform calls
+    # per sensor
+    temperature = _BASE_T + _RNG.uniform(-2, 2, _N)
+    humidity = _BASE_H + _RNG.uniform(-5, 5, _N)
+    co2 = _RNG.uniform(400, 600, _N)
+    pressure = _RNG.uniform(990, 1020, _N)
+
+    # Apply active scenarios as masked vector ops (building-level)
+    temp_scenario = ACTIVE_SCENARIOS.get('temperature_spike', {})
+    if temp_scenario.get('active'):
+        mask = _BUILDING_IDS == temp_scenario.get('building_id')
+        temperature += np.where(mask, temp_scenario.get('intensity', 10), 0)
+
+    humidity_scenario = ACTIVE_SCENARIOS.get('humidity_drop', {})
+    if humidity_scenario.get('active'):
+        mask = _BUILDING_IDS == humidity_scenario.get('building_id')
+        humidity -= np.where(mask, humidity_scenario.get('intensity', 15), 0)
+
+    co2_scenario = ACTIVE_SCENARIOS.get('co2_alarm', {})
+    if co2_scenario.get('active'):
+        mask = _BUILDING_IDS == co2_scenario.get('building_id')
+        co2 += np.where(mask, co2_scenario.get('intensity', 400), 0)
+
+    failure_scenario = ACTIVE_SCENARIOS.get('equipment_failure', {})
+    if failure_scenario.get('active'):
+        # Equipment failure: erratic readings
+        mask = _BUILDING_IDS == failure_scenario.get('building_id')
+        temperature = np.where(mask, temperature + _RNG.uniform(-10, 10, _N), temperature)
+        humidity = np.where(mask, _RNG.uniform(0, 100, _N), humidity)
+        co2 = np.where(mask, _RNG.uniform(0, 2000, _N), co2)
+        pressure = np.where(mask, _RNG.uniform(900, 1100, _N), pressure)
+
+    # tolist() materializes native Python floats/ints for psycopg2
+    temperature = np.round(temperature, 2).tolist()
+    humidity = np.round(humidity, 2).tolist()
+    co2 = np.round(co2, 2).tolist()
+    pressure = np.round(pressure, 2).tolist()
+
+    return [
+        {
+            'sensor_id': sid,
+            'temperature': t,
+            'humidity': h,
+            'co2': c,
+            'pressure': p,
+            'building_id': bid,
+            'controller_id': cid,
+            'timestamp': ts
+        }
+        for sid, t, h, c, p, bid, cid in zip(
+            _SENSOR_IDS, temperature, humidity, co2, pressure,
+            _BUILDING_IDS.tolist(), _CONTROLLER_IDS)
     ]
-    
-    readings = []
-    for building_id, controller_id, sensor_id in sensors_config:
-        reading = generate_sensor_reading(sensor_id, building_id, controller_id)
-        readings.append(reading)
-    
-    return readings
 
 def insert_readings(readings):
     """Bulk insert readings into database"""
+    # History rows stream through COPY, which skips the per-row
+    # parse/plan path entirely; the multi-VALUES insert below is the
+    # fallback when COPY is unavailable (e.g. restricted roles)
+    copy_query = """
+        COPY sensor_readings
+        (sensor_id, timestamp, temperature, humidity, co2, pressure, building_id, controller_id)
+        FROM STDIN WITH CSV
+    """
+    insert_query = """
+        INSERT INTO sensor_readings
+        (sensor_id, timestamp, temperature, humidity, co2, pressure, building_id, controller_id)
+        VALUES %s
+    """
+
+    # Keep the one-row-per-sensor latest table current in the same
+    # transaction; dashboard reads hit this instead of DISTINCT ON
+    # over recent history. UNNEST over bound arrays keeps the SQL text
+    # constant-size (no generated VALUES list) in one round trip
+    upsert_query = """
+        INSERT INTO sensor_readings_latest
+        (sensor_id, timestamp, temperature, humidity, co2, pressure, building_id, controller_id)
+        SELECT * FROM UNNEST(
+            %s::int[], %s::timestamp[], %s::real[], %s::real[],
+            %s::real[], %s::real[], %s::int[], %s::int[])
+        ON CONFLICT (sensor_id) DO UPDATE SET
+            timestamp = EXCLUDED.timestamp,
+            temperature = EXCLUDED.temperature,
+            humidity = EXCLUDED.humidity,
+            co2 = EXCLUDED.co2,
+            pressure = EXCLUDED.pressure,
+            building_id = EXCLUDED.building_id,
+            controller_id = EXCLUDED.controller_id
+        WHERE EXCLUDED.timestamp > sensor_readings_latest.timestamp
+    """
+
+    values = [
+        (
+            r['sensor_id'],
+            r['timestamp'],
+            r['temperature'],
+            r['humidity'],
+            r['co2'],
+            r['pressure'],
+            r['building_id'],
+            r['controller_id']
+        )
+        for r in readings
+    ]
+
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Bulk insert
-        insert_query = """
-            INSERT INTO sensor_readings 
-            (sensor_id, timestamp, temperature, humidity, co2, pressure, building_id, controller_id)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        values = [
-            (
-                r['sensor_id'],
-                r['timestamp'],
-                r['temperature'],
-                r['humidity'],
-                r['co2'],
-                r['pressure'],
-                r['building_id'],
-                r['controller_id']
-            )
-            for r in readings
-        ]
-        
-        cursor.executemany(insert_query, values)
-        
-        cursor.close()
-        conn.close()
-        
+        with borrow_connection() as conn:
+            # History insert + latest upsert must land together
+            conn.autocommit = False
+            cursor = conn.cursor()
+
+            try:
+                buf = io.StringIO()
+                writer = csv.writer(buf)
+                for row in values:
+                    writer.writerow(row)
+                buf.seek(0)
+                cursor.copy_expert(copy_query, buf)
+            except psycopg2.Error:
+                conn.rollback()
+                execute_values(cursor, insert_query, values, page_size=1000)
+
+            # psycopg2 adapts lists to arrays (tuples would become row
+            # constructors), so transpose the row tuples into columns
+            cursor.execute(upsert_query, [list(col) for col in zip(*values)])
+            conn.commit()
+            cursor.close()
+
         return True
     except Exception as e:
         print(f"❌ Insert error: {e}")
@@ -181,18 +328,18 @@ def insert_readings(readings):
 def cleanup_old_data():
     """Delete readings older than 1 hour to prevent database bloat"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            DELETE FROM sensor_readings 
-            WHERE timestamp < NOW() - INTERVAL '1 hour'
-        """)
-        
-        deleted = cursor.rowcount
-        cursor.close()
-        conn.close()
-        
+        with borrow_connection() as conn:
+            conn.autocommit = True
+            cursor = conn.cursor()
+
+            cursor.execute("""
+                DELETE FROM sensor_readings
+                WHERE timestamp < NOW() - INTERVAL '1 hour'
+            """)
+
+            deleted = cursor.rowcount
+            cursor.close()
+
         if deleted > 0:
             print(f"🗑️  Cleaned up {deleted} old readings")
         
@@ -4,13 +4,17 @@ ProMonitor - Modbus Emulator Integration with Main Database
 Writes sensor data to Django data_data table instead of sensor_readings
 """
 
+import functools
 import psycopg2
+from psycopg2.extras import execute_values
 import os
 import time
 import random
 from datetime import datetime, timedelta
+from urllib.parse import urlsplit, unquote
 import threading
 
+@functools.lru_cache(maxsize=1)
 def get_db_config():
     """Get database configuration from environment variables"""
     # Railway environment variables
@@ -22,18 +26,17 @@ def get_db_config():
             'user': os.environ.get('POSTGRES_USER', 'postgres'),
             'password': os.environ.get('POSTGRES_PASSWORD', '')
         }
-    # Fallback to DATABASE_URL parsing
+    # Fallback to DATABASE_URL parsing (urlsplit handles percent-encoding
+    # and special characters in the password, unlike a hand-rolled regex)
     elif os.environ.get('DATABASE_URL'):
-        url = os.environ['DATABASE_URL']
-        import re
-        match = re.match(r'postgresql://([^:]+):([^@]+)@([^:]+):(\d+)/(.+)', url)
-        if match:
+        parts = urlsplit(os.environ['DATABASE_URL'])
+        if parts.scheme.startswith('postgres'):
             return {
-                'user': match.group(1),
-                'password': match.group(2),
-                'host': match.group(3),
-                'port': match.group(4),
-                'database': match.group(5)
+                'user': unquote(parts.username) if parts.username else 'postgres',
+                'password': unquote(parts.password) if parts.password else '',
+                'host': parts.hostname or 'localhost',
+                'port': str(parts.port or 5432),
+                'database': parts.path.lstrip('/') or 'railway'
             }
     # Development fallback
     return {
@@ -48,7 +51,9 @@ def get_db_connection():
     """Create and return database connection"""
     config = get_db_config()
     conn = psycopg2.connect(**config)
-    conn.autocommit = True
+    # Explicit transactions: one commit (and WAL flush) per tick instead
+    # of one per statement
+    conn.autocommit = False
     return conn
 
 class ModbusIntegrationWriter:
@@ -69,6 +74,11 @@ class ModbusIntegrationWriter:
         self.cursor = None
         self.running = False
         self.sensor_mappings = {}
+        # Write buffer: readings accumulate across ticks (keeping their
+        # original timestamps) and flush on deadline or size, trading a
+        # bounded window of durability for fewer commits and WAL syncs
+        self._buffer = []
+        self._buffer_deadline = None
         
     def connect(self):
         """Connect to database and get sensor mappings"""
@@ -86,13 +96,26 @@ class ModbusIntegrationWriter:
                 LIMIT 20
             """)
             sensors = self.cursor.fetchall()
-            
+
+            # Prepare the single-write INSERT once per connection so
+            # write_sensor_data skips parse/plan on every call; the
+            # batched tick path goes through execute_values instead
+            self.cursor.execute("""
+                PREPARE ins_data (float8, timestamp, int) AS
+                INSERT INTO data_data (created_at, updated_at, value, date, name_id)
+                VALUES (NOW(), NOW(), $1, $2, $3)
+            """)
+            self.conn.commit()
+
             if sensors:
                 print(f"✅ Found {len(sensors)} Modbus sensors in database:")
                 for sensor in sensors:
                     self.sensor_mappings[sensor[0]] = {
                         'name': sensor[1],
-                        'sys_id': sensor[2]
+                        'sys_id': sensor[2],
+                        # Classify once here: the emulation tick then does
+                        # a dict lookup instead of rescanning the name
+                        'range': self._value_range(sensor[1])
                     }
                     print(f"   - Sensor {sensor[0]}: {sensor[1]} (System {sensor[2]})")
             else:
@@ -106,6 +129,20 @@ class ModbusIntegrationWriter:
             print(f"❌ Database connection failed: {e}")
             return False
     
+    @staticmethod
+    def _value_range(name):
+        """Map a sensor name to its realistic (low, high) value range"""
+        name = name.lower()
+        if 'temp' in name or 'температура' in name:
+            return (18.0, 26.0)
+        elif 'humid' in name or 'влажность' in name:
+            return (35.0, 65.0)
+        elif 'co2' in name:
+            return (400.0, 800.0)
+        elif 'press' in name or 'давление' in name:
+            return (1010.0, 1020.0)
+        return (0.0, 100.0)
+
     def _create_demo_sensors(self):
         """Create demo sensors if none exist"""
         # This is a fallback - in production, sensors should be created via Django admin
@@ -130,63 +167,81 @@ class ModbusIntegrationWriter:
                 print(f"⚠️  Sensor {sensor_id} not found in mappings")
                 return False
             
-            # Insert into data_data table
-            self.cursor.execute("""
-                INSERT INTO data_data (created_at, updated_at, value, date, name_id)
-                VALUES (NOW(), NOW(), %s, %s, %s)
-                RETURNING id
-            """, (value, timestamp, sensor_id))
-            
-            result_id = self.cursor.fetchone()[0]
-            print(f"✅ Written: Sensor {sensor_id} = {value} at {timestamp} (ID: {result_id})")
+            # Insert into data_data table via the statement prepared at
+            # connect(); no RETURNING — the id was only ever used for
+            # logging and forces an extra result round trip
+            self.cursor.execute("EXECUTE ins_data (%s, %s, %s)",
+                                (value, timestamp, sensor_id))
+            self.conn.commit()
+
+            print(f"✅ Written: Sensor {sensor_id} = {value} at {timestamp}")
             return True
-            
+
         except Exception as e:
             print(f"❌ Error writing sensor data: {e}")
+            self.conn.rollback()
             return False
     
-    def start_emulation(self, interval=30):
+    def _flush_buffer(self, flush_seconds):
+        """Write buffered readings as one multi-VALUES INSERT and commit"""
+        if self._buffer:
+            execute_values(self.cursor, """
+                INSERT INTO data_data (created_at, updated_at, value, date, name_id)
+                VALUES %s
+            """, self._buffer, template="(NOW(), NOW(), %s, %s, %s)", page_size=500)
+            self.conn.commit()
+            print(f"✅ Flushed {len(self._buffer)} buffered readings")
+            self._buffer.clear()
+        self._buffer_deadline = time.monotonic() + flush_seconds
+
+    def start_emulation(self, interval=30, flush_seconds=90, max_rows=1000):
         """
         Start continuous sensor data emulation
-        
+
         Args:
             interval: Seconds between readings (default 30)
+            flush_seconds: Max age of a buffered reading before flush
+            max_rows: Flush early once the buffer reaches this size
         """
         self.running = True
-        print(f"\n🚀 Starting Modbus emulation (interval: {interval}s)")
-        
+        print(f"\n🚀 Starting Modbus emulation (interval: {interval}s, flush: {flush_seconds}s)")
+        self._buffer_deadline = time.monotonic() + flush_seconds
+
         while self.running:
             try:
-                for sensor_id in self.sensor_mappings.keys():
-                    # Generate realistic sensor values based on type
-                    sensor_name = self.sensor_mappings[sensor_id]['name'].lower()
-                    
-                    if 'temp' in sensor_name or 'температура' in sensor_name:
-                        value = round(random.uniform(18.0, 26.0), 2)
-                    elif 'humid' in sensor_name or 'влажность' in sensor_name:
-                        value = round(random.uniform(35.0, 65.0), 2)
-                    elif 'co2' in sensor_name:
-                        value = round(random.uniform(400.0, 800.0), 2)
-                    elif 'press' in sensor_name or 'давление' in sensor_name:
-                        value = round(random.uniform(1010.0, 1020.0), 2)
-                    else:
-                        value = round(random.uniform(0.0, 100.0), 2)
-                    
-                    # Write to database
-                    self.write_sensor_data(sensor_id, value)
-                
+                # Buffer the tick; readings keep the timestamp of the
+                # tick that produced them. The flush batches several
+                # ticks into one round trip and one WAL sync
+                timestamp = datetime.now()
+                for sensor_id, mapping in self.sensor_mappings.items():
+                    # Realistic value range classified once at connect()
+                    lo, hi = mapping['range']
+                    self._buffer.append((round(random.uniform(lo, hi), 2),
+                                         timestamp, sensor_id))
+
+                if (time.monotonic() >= self._buffer_deadline
+                        or len(self._buffer) >= max_rows):
+                    self._flush_buffer(flush_seconds)
+
                 time.sleep(interval)
-                
+
             except KeyboardInterrupt:
                 print("\n⚠️  Stopping emulation...")
                 self.running = False
             except Exception as e:
                 print(f"❌ Emulation error: {e}")
+                self.conn.rollback()
                 time.sleep(5)
     
     def stop(self):
         """Stop emulation and close connection"""
         self.running = False
+        # Don't lose the buffered tail on shutdown
+        if self._buffer and self.cursor:
+            try:
+                self._flush_buffer(0)
+            except Exception as e:
+                print(f"❌ Final flush failed: {e}")
         if self.cursor:
             self.cursor.close()
         if self.conn:
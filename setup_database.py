@@ -4,11 +4,16 @@ ProMonitor Database Setup - Real-Time Version
 Generates readings with CURRENT timestamps (last 5 minutes) for immediate dashboard display
 """
 
+import csv
+import functools
+import io
 import psycopg2
+import numpy as np
 import os
 import random
 from datetime import datetime, timedelta
 
+@functools.lru_cache(maxsize=1)
 def get_db_config():
     """Get database configuration from environment variables"""
     if os.environ.get('POSTGRES_DB'):
@@ -38,13 +43,19 @@ def main():
     conn = psycopg2.connect(**config)
     conn.autocommit = False
     cursor = conn.cursor()
+    # Setup rebuilds everything from scratch, so there is nothing worth
+    # an fsync wait per commit: async commits skip the WAL flush stall
+    # (worst case on a crash is rerunning this script). Session-local —
+    # the services connect with default durability
+    cursor.execute("SET synchronous_commit = off")
     print("✅ Connected!")
     
-    # Drop old table
-    print("\n📝 Dropping old table if exists...")
+    # Drop old tables
+    print("\n📝 Dropping old tables if exist...")
     cursor.execute("DROP TABLE IF EXISTS sensor_readings CASCADE")
+    cursor.execute("DROP TABLE IF EXISTS sensor_readings_latest CASCADE")
     conn.commit()
-    print("✅ Old table dropped!")
+    print("✅ Old tables dropped!")
     
     # Create table
     print("\n📝 Creating sensor_readings table...")
@@ -53,25 +64,54 @@ def main():
             id SERIAL PRIMARY KEY,
             sensor_id INTEGER NOT NULL,
             timestamp TIMESTAMP NOT NULL,
-            temperature DECIMAL(5,2),
-            humidity DECIMAL(5,2),
-            co2 DECIMAL(7,2),
-            pressure DECIMAL(7,2),
+            temperature REAL,
+            humidity REAL,
+            co2 REAL,
+            pressure REAL,
             building_id INTEGER NOT NULL,
             controller_id INTEGER NOT NULL
         )
     """
     cursor.execute(create_table_sql)
+
+    # Small writer-maintained "latest" table: one row per sensor, upserted
+    # by the data generator in the same transaction as the historical
+    # insert. The dashboard reads it with a trivial index scan instead of
+    # DISTINCT ON over the last minutes of history
+    cursor.execute("""
+        CREATE TABLE sensor_readings_latest (
+            sensor_id INTEGER PRIMARY KEY,
+            timestamp TIMESTAMP NOT NULL,
+            temperature REAL,
+            humidity REAL,
+            co2 REAL,
+            pressure REAL,
+            building_id INTEGER NOT NULL,
+            controller_id INTEGER NOT NULL
+        )
+    """)
     conn.commit()
-    print("✅ Table created!")
+    print("✅ Tables created!")
     
-    # Create indexes
-    print("\n🔍 Creating indexes...")
-    cursor.execute("CREATE INDEX idx_sensor_id ON sensor_readings(sensor_id)")
-    cursor.execute("CREATE INDEX idx_timestamp ON sensor_readings(timestamp DESC)")
-    cursor.execute("CREATE INDEX idx_building_id ON sensor_readings(building_id)")
+    # Create NOTIFY trigger so the dashboard broadcaster is push-driven
+    print("\n🔔 Creating NOTIFY trigger for real-time broadcast...")
+    # Statement-level: one NOTIFY per INSERT statement, not one per row,
+    # so a batched insert wakes the listener exactly once
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION notify_sensor_insert() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('sensor_insert', '');
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    cursor.execute("""
+        CREATE TRIGGER sensor_readings_notify
+        AFTER INSERT ON sensor_readings
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_sensor_insert()
+    """)
     conn.commit()
-    print("✅ Indexes created!")
+    print("✅ Trigger created!")
     
     # Check existing data
     print("\n📊 Checking existing data...")
@@ -100,10 +140,21 @@ def main():
     time_interval = timedelta(seconds=30)
     readings_per_sensor = 10
     
+    # Stream the whole seed through COPY: rows go into an in-memory CSV
+    # buffer and load in one statement, instead of batched executemany
+    # round trips with per-row parameter parsing
     sensor_id = 1
     total_readings = 0
-    insert_batch = []
-    
+    copy_buffer = io.StringIO()
+    copy_writer = csv.writer(copy_buffer)
+
+    # The per-reading variations are vectorized: one C-level RNG draw per
+    # column per sensor instead of a Python random.uniform call per value.
+    # Timestamps are shared by every sensor, so precompute them once
+    rng = np.random.default_rng()
+    timestamps = [(start_time + time_interval * i).isoformat()
+                  for i in range(readings_per_sensor)]
+
     for building in buildings:
         for controller_id in range(1, building['controllers'] + 1):
             # Each controller has 4 sensors
@@ -113,52 +164,70 @@ def main():
                 humidity_base = 45 + building['id'] * 2 + random.uniform(-5, 5)
                 co2_base = 400 + building['id'] * 50 + random.uniform(-30, 30)
                 pressure_base = 1013 + random.uniform(-5, 5)
-                
-                # Generate readings over time
-                for i in range(readings_per_sensor):
-                    timestamp = start_time + (time_interval * i)
-                    
-                    # Add realistic variations
-                    temperature = temp_base + random.uniform(-0.5, 0.5)
-                    humidity = humidity_base + random.uniform(-2, 2)
-                    co2 = co2_base + random.uniform(-20, 20)
-                    pressure = pressure_base + random.uniform(-1, 1)
-                    
-                    insert_batch.append((
-                        sensor_id,
-                        timestamp,
-                        round(temperature, 2),
-                        round(humidity, 2),
-                        round(co2, 2),
-                        round(pressure, 2),
-                        building['id'],
-                        controller_id
-                    ))
-                    
-                    total_readings += 1
-                    
-                    # Insert in batches of 500
-                    if len(insert_batch) >= 500:
-                        cursor.executemany("""
-                            INSERT INTO sensor_readings 
-                            (sensor_id, timestamp, temperature, humidity, co2, pressure, building_id, controller_id)
-                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                        """, insert_batch)
-                        conn.commit()
-                        insert_batch = []
-                        print(f"   Generated {total_readings} readings...")
-                
+
+                # Readings over time, with realistic variations
+                temperature = np.round(temp_base + rng.uniform(-0.5, 0.5, readings_per_sensor), 2)
+                humidity = np.round(humidity_base + rng.uniform(-2, 2, readings_per_sensor), 2)
+                co2 = np.round(co2_base + rng.uniform(-20, 20, readings_per_sensor), 2)
+                pressure = np.round(pressure_base + rng.uniform(-1, 1, readings_per_sensor), 2)
+
+                copy_writer.writerows(zip(
+                    [sensor_id] * readings_per_sensor,
+                    timestamps,
+                    temperature,
+                    humidity,
+                    co2,
+                    pressure,
+                    [building['id']] * readings_per_sensor,
+                    [controller_id] * readings_per_sensor
+                ))
+
+                total_readings += readings_per_sensor
                 sensor_id += 1
-    
-    # Insert remaining
-    if insert_batch:
-        cursor.executemany("""
-            INSERT INTO sensor_readings 
-            (sensor_id, timestamp, temperature, humidity, co2, pressure, building_id, controller_id)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """, insert_batch)
-        conn.commit()
-    
+
+    print(f"   Generated {total_readings} readings, loading via COPY...")
+    copy_buffer.seek(0)
+    cursor.copy_expert("""
+        COPY sensor_readings
+        (sensor_id, timestamp, temperature, humidity, co2, pressure, building_id, controller_id)
+        FROM STDIN WITH CSV
+    """, copy_buffer)
+    conn.commit()
+
+    # Create indexes only now, after the bulk load: building a btree once
+    # over sorted input beats maintaining it row by row during the COPY.
+    # Extra maintenance_work_mem keeps the builds in memory
+    print("\n🔍 Creating indexes...")
+    cursor.execute("SET maintenance_work_mem = '256MB'")
+    cursor.execute("CREATE INDEX idx_sensor_id ON sensor_readings(sensor_id)")
+    # BRIN instead of btree for the pure time-range filter: the table is
+    # append-only so timestamp correlates with physical order, and BRIN
+    # stays a few pages regardless of row count. Ordered per-sensor
+    # lookups still go through the btree composite below
+    cursor.execute("""
+        CREATE INDEX idx_timestamp_brin ON sensor_readings
+        USING BRIN (timestamp) WITH (pages_per_range = 32)
+    """)
+    cursor.execute("CREATE INDEX idx_building_id ON sensor_readings(building_id)")
+    # Covering index: DISTINCT ON (sensor_id) ... ORDER BY sensor_id, timestamp DESC
+    # becomes an index-only scan instead of a full-table sort
+    cursor.execute("""
+        CREATE INDEX idx_sensor_ts_desc ON sensor_readings(sensor_id, timestamp DESC)
+        INCLUDE (temperature, humidity, co2, pressure, building_id, controller_id)
+    """)
+    conn.commit()
+    print("✅ Indexes created!")
+
+    # Seed the latest table from what was just inserted
+    cursor.execute("""
+        INSERT INTO sensor_readings_latest
+        SELECT DISTINCT ON (sensor_id)
+            sensor_id, timestamp, temperature, humidity, co2, pressure, building_id, controller_id
+        FROM sensor_readings
+        ORDER BY sensor_id, timestamp DESC
+    """)
+    conn.commit()
+
     print(f"\n✅ Successfully generated {total_readings} REAL-TIME readings!")
     
     # Show statistics
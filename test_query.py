@@ -1,17 +1,12 @@
 #!/usr/bin/env python3
 """Direct SQL query test"""
 import psycopg2
-import os
 import sys
 
+from setup_database import get_db_config
+
 try:
-    conn = psycopg2.connect(
-        host=os.environ.get('PGHOST', 'postgres.railway.internal'),
-        port=os.environ.get('PGPORT', '5432'),
-        database=os.environ.get('POSTGRES_DB', 'railway'),
-        user=os.environ.get('POSTGRES_USER', 'postgres'),
-        password=os.environ.get('POSTGRES_PASSWORD')
-    )
+    conn = psycopg2.connect(**get_db_config())
     
     cursor = conn.cursor()
     
@@ -19,20 +14,29 @@ try:
     print("Direct SQL Query Test")
     print("="*60)
     
-    # Same query as app.py
+    # Latest reading per sensor. LATERAL instead of DISTINCT ON: one
+    # descending index probe per sensor on (sensor_id, timestamp DESC)
+    # rather than sorting every row in the 24-hour window
     query = """
-        SELECT DISTINCT ON (sensor_id) 
-            sensor_id,
-            timestamp,
-            temperature,
-            humidity,
-            co2,
-            pressure,
-            building_id,
-            controller_id
-        FROM sensor_readings
-        WHERE timestamp >= NOW() - INTERVAL '24 hours'
-        ORDER BY sensor_id, timestamp DESC
+        SELECT r.sensor_id,
+               r.timestamp,
+               r.temperature,
+               r.humidity,
+               r.co2,
+               r.pressure,
+               r.building_id,
+               r.controller_id
+        FROM (SELECT DISTINCT sensor_id FROM sensor_readings) s,
+        LATERAL (
+            SELECT sensor_id, timestamp, temperature, humidity, co2,
+                   pressure, building_id, controller_id
+            FROM sensor_readings
+            WHERE sensor_id = s.sensor_id
+              AND timestamp >= NOW() - INTERVAL '24 hours'
+            ORDER BY timestamp DESC
+            LIMIT 1
+        ) r
+        ORDER BY r.sensor_id
     """
     
     cursor.execute(query)